@@ -8,20 +8,188 @@ Three-phase architecture:
 """
 
 import argparse
+import hashlib
+import io
 import json
+import mmap
 import os
 import re
 import subprocess
 import sys
 import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import ijson  # Optional: streaming parse of large content_list.json files
+except ImportError:
+    ijson = None
 
-@dataclass
+try:
+    import orjson  # Optional: C-accelerated JSON for large LLM responses
+except ImportError:
+    orjson = None
+
+try:
+    import httpx  # Optional: HTTP/2 keep-alive client for Azure calls
+except ImportError:
+    httpx = None
+
+
+def _json_loads(data):
+    """Decode JSON with orjson when available, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_llm_json(content: str) -> Optional[Dict]:
+    """Parse the first JSON object embedded in LLM output, or None.
+
+    `raw_decode` stops at the end of the first complete value, so markdown
+    fences and trailing commentary around the JSON are tolerated in a single
+    forward pass - no brace-balancing prescan or regex needed.
+    """
+    start = content.find('{')
+    if start == -1:
+        return None
+    try:
+        result, _ = _JSON_DECODER.raw_decode(content, start)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def _line_writer(buf: io.StringIO):
+    """Return a callable appending one line to `buf`.
+
+    Writes go into a contiguous C-level buffer instead of growing a Python
+    list of small strings that a final join would re-walk.
+    """
+    write = buf.write
+
+    def _append_line(line: str) -> None:
+        write(line)
+        write("\n")
+
+    return _append_line
+
+
+def _debug_dump_text(path: Path, content: str, label: str) -> None:
+    """Save an LLM output dump when PIPELINE_DEBUG is set.
+
+    The write is synchronous - debugging is opt-in and off the hot path, and
+    the message below must not claim a file that is not on disk yet.
+    """
+    if not os.getenv("PIPELINE_DEBUG"):
+        return
+    path.write_bytes(content.encode("utf-8"))
+    print(f"[DEBUG] {label} LLM output saved to: {path}", file=sys.stderr)
+
+
+def _write_debug_json(path: Path, obj) -> None:
+    """Pretty-print a debug JSON dump, preferring the fast orjson encoder."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+
+# Markdown parsing hot path: sentence terminators + pre-compiled regexes
+_SENT_TERMINATORS = frozenset("。！？!?.")
+# \r? keeps CRLF markdown parseable now that lines are no longer split first
+_HEADER_RE_MULTI = re.compile(r"^(#{1,6})[ \t]+(.*\S)[ \t]*\r?$", re.MULTILINE)
+_PARA_RE = re.compile(r"\n\s*\n+")
+
+# Pre-compiled title-keyword alternations for role routing (single regex scan
+# per title instead of repeated substring checks)
+_METHOD_TITLE_RE = re.compile(r"method|approach|architecture|model|framework|pipeline")
+_EVAL_TITLE_RE = re.compile(r"result|experiment|evaluation|performance|comparison")
+_EQUATION_TITLE_RE = re.compile(r"method|model|formulation|optimization")
+# (role, title regex) pairs for the heuristic fallback classifier
+_FALLBACK_ROLE_RES = [
+    ("method_pipeline", re.compile(r"method|approach|pipeline|方法|流程")),
+    ("model_architecture", re.compile(r"model|architecture|network|模型|结构")),
+    ("data", re.compile(r"data|dataset|数据")),
+    ("evaluation_results", re.compile(r"experiment|evaluation|result|实验|评估")),
+    ("training_inference", re.compile(r"training|optimization|训练")),
+]
+_ARCH_CAP_RE = re.compile(
+    r"architecture|framework|pipeline|model|system|overview|diagram|workflow|structure|network"
+)
+
+# Retry policy shared by both transports: the requests session applies it via
+# urllib3's Retry, the httpx path mirrors it in _post_with_retries
+_RETRY_TOTAL = 3
+_RETRY_BACKOFF = 0.5
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Shared HTTP session: connection pooling + TLS reuse across Phase-1/Phase-2 calls,
+# with transport-level retries for transient Azure errors
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=_RETRY_TOTAL,
+            backoff_factor=_RETRY_BACKOFF,
+            status_forcelist=list(_RETRY_STATUSES),
+            allowed_methods=["POST"],
+        ),
+    ),
+)
+
+# Preferred transport when httpx is installed: HTTP/2 multiplexing plus
+# keep-alive, falling back to HTTP/1.1 when the h2 extra is missing and to
+# the requests session above when httpx is absent entirely
+_HTTP: Optional["httpx.Client"] = None
+if httpx is not None:
+    _HTTPX_KWARGS = dict(
+        timeout=httpx.Timeout(120.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+    )
+    try:
+        _HTTP = httpx.Client(http2=True, **_HTTPX_KWARGS)
+    except ImportError:
+        _HTTP = httpx.Client(**_HTTPX_KWARGS)
+
+
+def _post_with_retries(url: str, headers: Dict, payload: Dict):
+    """POST via the httpx client with the same status-aware retry policy the
+    requests session gets from its HTTPAdapter (httpx has no built-in
+    equivalent: HTTPTransport(retries=...) only covers connect errors)."""
+    resp = None
+    for attempt in range(_RETRY_TOTAL + 1):
+        try:
+            resp = _HTTP.post(url, headers=headers, json=payload)
+        except httpx.TransportError:
+            if attempt == _RETRY_TOTAL:
+                raise
+            time.sleep(_RETRY_BACKOFF * (2 ** attempt))
+            continue
+        if resp.status_code not in _RETRY_STATUSES or attempt == _RETRY_TOTAL:
+            return resp
+        # Honor Retry-After on 429s like urllib3's Retry does, capped sanely
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            time.sleep(min(int(retry_after), 60))
+        else:
+            time.sleep(_RETRY_BACKOFF * (2 ** attempt))
+    return resp
+
+
+@dataclass(slots=True)
 class Module:
     module_id: str
     level: int
@@ -33,6 +201,11 @@ class Module:
     figures: Optional[List[Dict]] = None  # List of figures in this section
     tables: Optional[List[Dict]] = None   # List of tables in this section
     equations: Optional[List[Dict]] = None  # List of equations in this section
+    # Pre-extracted display strings (SoA layout) so summary rendering needs no
+    # nested dict/list access; populated alongside the raw element lists
+    figure_captions: Optional[List[str]] = None
+    table_captions: Optional[List[str]] = None
+    equation_latex: Optional[List[str]] = None
 
 
 def run_mineru_cli(pdf_path: Path, output_dir: Path) -> tuple[Path, Optional[Path]]:
@@ -57,12 +230,11 @@ def run_mineru_cli(pdf_path: Path, output_dir: Path) -> tuple[Path, Optional[Pat
             f"mineru CLI failed:\nSTDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}"
         )
 
-    md_files = sorted(output_dir.rglob("*.md"), key=lambda p: p.stat().st_size, reverse=True)
-    if not md_files:
+    md_path = max(output_dir.rglob("*.md"), key=lambda p: p.stat().st_size, default=None)
+    if md_path is None:
         raise FileNotFoundError(f"No .md files found under {output_dir}")
 
     # Try to find content_list.json in the same directory as the markdown file
-    md_path = md_files[0]
     content_list_path = md_path.parent / f"{md_path.stem}_content_list.json"
     
     if not content_list_path.exists():
@@ -72,13 +244,67 @@ def run_mineru_cli(pdf_path: Path, output_dir: Path) -> tuple[Path, Optional[Pat
     return md_path, content_list_path
 
 
-def split_sentences(paragraph: str) -> List[str]:
+def _read_md(path: Path) -> str:
+    """Read a markdown file through a read-only mmap.
+
+    The bytes are still copied once for decoding; the mapping only skips the
+    buffered-I/O layer, so this is a modest win for multi-MB papers.
+    """
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:].decode("utf-8", errors="ignore")
+        except ValueError:
+            # Empty files cannot be mapped
+            return ""
+
+
+def _first_sentence(paragraph: str) -> str:
+    """Extract the first sentence with a left-to-right scan - O(first sentence)
+    instead of splitting the whole paragraph."""
     text = paragraph.strip()
-    if not text:
-        return []
-    parts = re.split(r"(?<=[。！？!?\.])\s+", text)
-    sentences = [p.strip() for p in parts if p.strip()]
-    return sentences if sentences else [text]
+    n = len(text)
+    for i, c in enumerate(text):
+        if c in _SENT_TERMINATORS and i + 1 < n and text[i + 1].isspace():
+            return text[:i + 1]
+    return text
+
+
+def _last_sentence(paragraph: str) -> str:
+    """Extract the last sentence by scanning right-to-left for the final
+    sentence boundary."""
+    text = paragraph.strip()
+    for i in range(len(text) - 2, -1, -1):
+        if text[i] in _SENT_TERMINATORS and text[i + 1].isspace():
+            return text[i + 1:].strip()
+    return text
+
+
+def _first_para(content: str) -> str:
+    """First paragraph of `content` - stops at the first blank-line gap."""
+    m = _PARA_RE.search(content)
+    return content[:m.start()] if m else content
+
+
+def _last_para(content: str) -> str:
+    """Last paragraph of `content`, found by scanning backwards for the final
+    blank-line gap - no intermediate paragraph list."""
+    i = len(content) - 1
+    while i >= 0:
+        if content[i] == '\n':
+            j = i - 1
+            found_gap = False
+            while j >= 0 and content[j].isspace():
+                if content[j] == '\n':
+                    found_gap = True
+                    break
+                j -= 1
+            if found_gap:
+                return content[i + 1:]
+            i = j
+        else:
+            i -= 1
+    return content
 
 
 def parse_markdown_modules(md_text: str, content_list: Optional[List[Dict]] = None) -> List[Module]:
@@ -88,50 +314,27 @@ def parse_markdown_modules(md_text: str, content_list: Optional[List[Dict]] = No
         md_text: Markdown content
         content_list: Optional structured data from MinerU JSON for enhanced parsing
     """
-    lines = md_text.splitlines()
     modules: List[Module] = []
-    current_title: Optional[str] = None
-    current_level: Optional[int] = None
-    current_lines: List[str] = []
-    counter = 0
-
-    header_pattern = re.compile(r"^(#{1,6})\s+(.*\S)\s*$")
-
-    for line in lines:
-        m = header_pattern.match(line)
-        if m:
-            if current_title is not None:
-                counter += 1
-                modules.append(_build_module(counter, current_level, current_title, current_lines))
-
-            hashes, title = m.groups()
-            current_title = title.strip()
-            current_level = len(hashes)
-            current_lines = []
-        else:
-            if current_title is not None:
-                current_lines.append(line)
+    matches = list(_HEADER_RE_MULTI.finditer(md_text))
 
-    if current_title is not None:
-        counter += 1
-        modules.append(_build_module(counter, current_level, current_title, current_lines))
+    for i, m in enumerate(matches):
+        hashes, title = m.groups()
+        content_end = matches[i + 1].start() if i + 1 < len(matches) else len(md_text)
+        content = md_text[m.end():content_end]
+        # The header regex group already excludes surrounding whitespace
+        modules.append(_build_module(i + 1, len(hashes), title, content))
 
     return modules
 
 
-def _build_module(counter: int, level: Optional[int], title: str, lines: List[str]) -> Module:
-    content = "\n".join(lines).strip()
-    paragraphs = [p.strip() for p in re.split(r"\n\s*\n+", content) if p.strip()]
+def _build_module(counter: int, level: Optional[int], title: str, content: str) -> Module:
+    content = content.strip()
 
     first_sentence = ""
     last_sentence = ""
-    if paragraphs:
-        first_sentences = split_sentences(paragraphs[0])
-        if first_sentences:
-            first_sentence = first_sentences[0]
-        last_sentences = split_sentences(paragraphs[-1])
-        if last_sentences:
-            last_sentence = last_sentences[-1]
+    if content:
+        first_sentence = _first_sentence(_first_para(content))
+        last_sentence = _last_sentence(_last_para(content))
 
     return Module(
         module_id=f"sec_{counter}",
@@ -164,45 +367,75 @@ def enhance_modules_with_json(modules: List[Module], content_list_path: Optional
         return modules
     
     try:
-        with open(content_list_path, 'r', encoding='utf-8') as f:
-            content_list = json.load(f)
-        
-        # Extract structured elements with enhanced metadata
-        figures = [item for item in content_list if item.get('type') == 'image']
-        tables = [item for item in content_list if item.get('type') == 'table']
-        equations = [item for item in content_list if item.get('type') == 'equation']
+        if ijson is not None:
+            # Stream top-level array items instead of materializing the whole
+            # file as text first - lower peak memory on element-heavy papers
+            with open(content_list_path, 'rb') as f:
+                content_list = list(ijson.items(f, 'item'))
+        else:
+            with open(content_list_path, 'rb') as f:
+                content_list = _json_loads(f.read())
+
+        # Extract structured elements in one pass, dispatching by type
+        figures: List[Dict] = []
+        tables: List[Dict] = []
+        equations: List[Dict] = []
+        dispatch = {'image': figures.append, 'table': tables.append, 'equation': equations.append}
+        for item in content_list:
+            append = dispatch.get(item.get('type'))
+            if append:
+                append(item)
         
         print(f"[JSON Enhancement] Found {len(figures)} figures, {len(tables)} tables, {len(equations)} equations", file=sys.stderr)
-        
+
+        # Precompute the lowercased caption once per figure so the architecture
+        # heuristic is a single regex search, then evaluate it once per figure
+        for fig in figures:
+            fig['_caption_lower'] = ' '.join(fig.get('image_caption', [])).lower()
+        arch_figures = [f for f in figures if _is_architecture_figure(f)]
+
+        # Pre-extract display strings once (SoA) so summary rendering later
+        # needs no nested dict/list access per element
+        arch_figure_captions = _figure_caption_texts(arch_figures)
+        figure_captions = _figure_caption_texts(figures)
+        table_captions = _table_caption_texts(tables)
+        equation_latex = _equation_latex_texts(equations)
+
         # Smart distribution: assign visual elements to relevant modules
         for module in modules:
             title_lower = module.title.lower()
-            
+
             # Associate figures with method/architecture sections
-            if any(kw in title_lower for kw in ['method', 'approach', 'architecture', 'model', 'framework', 'pipeline']):
+            if _METHOD_TITLE_RE.search(title_lower):
                 # Attach figures that likely show architecture
-                module.figures = [f for f in figures if _is_architecture_figure(f)]
+                module.figures = arch_figures if arch_figures else None
+                module.figure_captions = arch_figure_captions if arch_figures else None
                 if module.figures:
                     print(f"  → Assigned {len(module.figures)} figure(s) to '{module.title}'", file=sys.stderr)
-            
+
             # Associate tables with results/evaluation sections
-            elif any(kw in title_lower for kw in ['result', 'experiment', 'evaluation', 'performance', 'comparison']):
+            elif _EVAL_TITLE_RE.search(title_lower):
                 module.tables = tables if tables else None
+                module.table_captions = table_captions if tables else None
                 if module.tables:
                     print(f"  → Assigned {len(module.tables)} table(s) to '{module.title}'", file=sys.stderr)
-            
+
             # Associate equations with method/model sections
-            elif any(kw in title_lower for kw in ['method', 'model', 'formulation', 'optimization']):
+            elif _EQUATION_TITLE_RE.search(title_lower):
                 module.equations = equations if equations else None
+                module.equation_latex = equation_latex if equations else None
                 if module.equations:
                     print(f"  → Assigned {len(module.equations)} equation(s) to '{module.title}'", file=sys.stderr)
-        
+
         # Fallback: attach all to first module as global reference
         if modules and not any(m.figures or m.tables or m.equations for m in modules):
             print("  → Fallback: Attaching all visual elements to first module", file=sys.stderr)
             modules[0].figures = figures if figures else None
+            modules[0].figure_captions = figure_captions if figures else None
             modules[0].tables = tables if tables else None
+            modules[0].table_captions = table_captions if tables else None
             modules[0].equations = equations if equations else None
+            modules[0].equation_latex = equation_latex if equations else None
             
     except Exception as e:
         print(f"[Warning] Failed to parse content_list.json: {e}", file=sys.stderr)
@@ -212,41 +445,35 @@ def enhance_modules_with_json(modules: List[Module], content_list_path: Optional
 
 def _is_architecture_figure(fig: Dict) -> bool:
     """Heuristic to identify architecture/pipeline figures."""
-    caption = ' '.join(fig.get('image_caption', [])).lower()
-    architecture_keywords = [
-        'architecture', 'framework', 'pipeline', 'model', 'system',
-        'overview', 'diagram', 'workflow', 'structure', 'network'
-    ]
-    return any(kw in caption for kw in architecture_keywords)
+    caption = fig.get('_caption_lower')
+    if caption is None:
+        caption = ' '.join(fig.get('image_caption', [])).lower()
+    return _ARCH_CAP_RE.search(caption) is not None
 
 
 def build_modules_summary(modules: List[Module]) -> str:
     """Build metadata-only summary for Phase 1, including visual elements hint."""
-    blocks = []
-    
+    buf = io.StringIO()
+
     # Add visual elements hint at the beginning
     total_figures = sum(len(m.figures) if m.figures else 0 for m in modules)
     total_tables = sum(len(m.tables) if m.tables else 0 for m in modules)
     total_equations = sum(len(m.equations) if m.equations else 0 for m in modules)
-    
+
     if total_figures > 0 or total_tables > 0 or total_equations > 0:
-        hint = f"[PAPER META] This paper contains {total_figures} figures, {total_tables} tables, {total_equations} equations\n\n"
-        blocks.append(hint)
-    
+        buf.write(f"[PAPER META] This paper contains {total_figures} figures, {total_tables} tables, {total_equations} equations\n\n")
+
     for m in modules:
-        block = textwrap.dedent(
-            f"""
-            [MODULE START]
-            id: {m.module_id}
-            level: {m.level}
-            title: {m.title}
-            first_sentence: {m.first_sentence}
-            last_sentence: {m.last_sentence}
-            [MODULE END]
-            """
-        ).strip()
-        blocks.append(block)
-    return "\n\n".join(blocks)
+        buf.write(
+            f"[MODULE START]\n"
+            f"id: {m.module_id}\n"
+            f"level: {m.level}\n"
+            f"title: {m.title}\n"
+            f"first_sentence: {m.first_sentence}\n"
+            f"last_sentence: {m.last_sentence}\n"
+            f"[MODULE END]\n\n"
+        )
+    return buf.getvalue().rstrip()
 
 
 def call_azure_gpt(
@@ -278,7 +505,10 @@ def call_azure_gpt(
         "api-key": api_key,
     }
 
-    resp = requests.post(url, headers=headers, json=payload, timeout=120)
+    if _HTTP is not None:
+        resp = _post_with_retries(url, headers, payload)
+    else:
+        resp = _SESSION.post(url, headers=headers, json=payload, timeout=120)
     if resp.status_code != 200:
         try:
             data = resp.json()
@@ -287,12 +517,13 @@ def call_azure_gpt(
         raise RuntimeError(f"Azure GPT request failed ({resp.status_code}): {data}")
 
     result = resp.json()
-    
-    # Debug: 保存完整的 API 响应
-    debug_api_path = Path("/tmp/azure_gpt_response.json")
-    debug_api_path.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
-    print(f"[DEBUG] Azure GPT full response saved to: {debug_api_path}", file=sys.stderr)
-    
+
+    # Debug: 保存完整的 API 响应 (set PIPELINE_DEBUG=1 to enable)
+    if os.getenv("PIPELINE_DEBUG"):
+        debug_api_path = Path("/tmp/azure_gpt_response.json")
+        _write_debug_json(debug_api_path, result)
+        print(f"[DEBUG] Azure GPT full response saved to: {debug_api_path}", file=sys.stderr)
+
     return result
 
 
@@ -300,16 +531,9 @@ def call_azure_gpt(
 # Phase 1: Module Role Routing
 # ============================================================
 
-def classify_module_roles(modules: List[Module]) -> Dict[str, List[str]]:
-    """
-    Phase 1: Classify each module into multiple functional roles based on metadata only.
-    
-    Returns a mapping: {module_id: [role1, role2, ...]}
+# Dedented once at import time - the prompt is static and multi-KB
+_PHASE1_SYSTEM_PROMPT = textwrap.dedent(
     """
-    summary = build_modules_summary(modules)
-
-    system_prompt = textwrap.dedent(
-        """
         You are a precise scientific paper structure classifier with expertise in ML/AI research papers.
         
         CRITICAL: Focus on accuracy and logical consistency. Each module MUST be classified correctly.
@@ -381,13 +605,57 @@ def classify_module_roles(modules: List[Module]) -> Dict[str, List[str]]:
             ...
           ]
         }
-        """
-    ).strip()
+    """
+).strip()
+
+
+# Modules per Phase-1 request; larger papers are classified concurrently
+_PHASE1_CHUNK_SIZE = 30
+
+
+def classify_module_roles(modules: List[Module]) -> Dict[str, List[str]]:
+    """
+    Phase 1: Classify each module into multiple functional roles based on metadata only.
+
+    Large papers are split into chunks of _PHASE1_CHUNK_SIZE modules and
+    classified concurrently - the Azure call is I/O-bound, so threads give a
+    near-linear speedup up to the service rate limit.
+
+    Returns a mapping: {module_id: [role1, role2, ...]}
+    """
+    if len(modules) <= _PHASE1_CHUNK_SIZE:
+        return _classify_modules_chunk(modules)
+
+    chunks = [modules[i:i + _PHASE1_CHUNK_SIZE] for i in range(0, len(modules), _PHASE1_CHUNK_SIZE)]
+    print(f"[Phase 1] Classifying {len(modules)} modules in {len(chunks)} concurrent chunks", file=sys.stderr)
+
+    roles_map: Dict[str, List[str]] = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as executor:
+        futures = [
+            executor.submit(_classify_modules_chunk, chunk, chunk_index=idx)
+            for idx, chunk in enumerate(chunks)
+        ]
+        for chunk, future in zip(chunks, futures):
+            try:
+                roles_map.update(future.result())
+            except Exception as e:
+                print(f"[Warning] Phase 1 chunk failed ({e}), using heuristic fallback", file=sys.stderr)
+                roles_map.update(_fallback_classify(chunk))
+
+    return roles_map
+
+
+def _classify_modules_chunk(modules: List[Module], chunk_index: Optional[int] = None) -> Dict[str, List[str]]:
+    """Classify one chunk of modules with a single LLM call.
+
+    `chunk_index` keeps concurrent chunks' debug dumps in separate files.
+    """
+    summary = build_modules_summary(modules)
 
     user_prompt = "Here are the modules:\n\n" + summary
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": _PHASE1_SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt},
     ]
 
@@ -403,20 +671,15 @@ def classify_module_roles(modules: List[Module]) -> Dict[str, List[str]]:
 
     content = data["choices"][0]["message"]["content"].strip()
     
-    # Debug: 保存原始 LLM 输出
-    debug_path = Path("/tmp/phase1_llm_output.txt")
-    debug_path.write_text(content, encoding="utf-8")
-    print(f"[DEBUG] Phase 1 LLM output saved to: {debug_path}", file=sys.stderr)
+    # Debug: 保存原始 LLM 输出 (set PIPELINE_DEBUG=1 to enable)
+    suffix = "" if chunk_index is None else f"_chunk{chunk_index}"
+    _debug_dump_text(Path(f"/tmp/phase1_llm_output{suffix}.txt"), content, "Phase 1")
 
     try:
-        result = json.loads(content)
-    except json.JSONDecodeError:
-        match = re.search(r"\{[\s\S]*\}", content)
-        if not match:
-            return _fallback_classify(modules)
-        try:
-            result = json.loads(match.group(0))
-        except Exception:
+        result = _json_loads(content)
+    except (json.JSONDecodeError, ValueError):
+        result = _parse_llm_json(content)
+        if result is None:
             return _fallback_classify(modules)
 
     modules_list = result.get("modules") or []
@@ -441,23 +704,8 @@ def _fallback_classify(modules: List[Module]) -> Dict[str, List[str]]:
     roles_map: Dict[str, List[str]] = {}
     for m in modules:
         title_lower = m.title.lower()
-        roles = []
-
-        if any(kw in title_lower for kw in ["method", "approach", "pipeline", "方法", "流程"]):
-            roles.append("method_pipeline")
-        if any(kw in title_lower for kw in ["model", "architecture", "network", "模型", "结构"]):
-            roles.append("model_architecture")
-        if any(kw in title_lower for kw in ["data", "dataset", "数据"]):
-            roles.append("data")
-        if any(kw in title_lower for kw in ["experiment", "evaluation", "result", "实验", "评估"]):
-            roles.append("evaluation_results")
-        if any(kw in title_lower for kw in ["training", "optimization", "训练"]):
-            roles.append("training_inference")
-
-        if not roles:
-            roles = ["other"]
-
-        roles_map[m.module_id] = roles
+        roles = [role for role, role_re in _FALLBACK_ROLE_RES if role_re.search(title_lower)]
+        roles_map[m.module_id] = roles or ["other"]
 
     return roles_map
 
@@ -467,87 +715,138 @@ def _fallback_classify(modules: List[Module]) -> Dict[str, List[str]]:
 # ============================================================
 
 def build_visual_elements_summary(modules: List[Module]) -> str:
-    """Build a summary of figures, tables, and equations from enhanced modules."""
-    lines = []
-    
+    """Build a summary of figures, tables, and equations from enhanced modules.
+
+    Single pass over modules: accumulates totals and captures the first
+    module's figures/tables/equations along the way instead of re-walking the
+    list per element type.
+    """
     total_figures = 0
     total_tables = 0
     total_equations = 0
-    
+    first_figure_captions: Optional[List[str]] = None
+    first_table_captions: Optional[List[str]] = None
+    first_equation_latex: Optional[List[str]] = None
+
     for m in modules:
         if m.figures:
             total_figures += len(m.figures)
+            if first_figure_captions is None:
+                first_figure_captions = (
+                    m.figure_captions if m.figure_captions is not None
+                    else _figure_caption_texts(m.figures)
+                )
         if m.tables:
             total_tables += len(m.tables)
+            if first_table_captions is None:
+                first_table_captions = (
+                    m.table_captions if m.table_captions is not None
+                    else _table_caption_texts(m.tables)
+                )
         if m.equations:
             total_equations += len(m.equations)
-    
+            if first_equation_latex is None:
+                first_equation_latex = (
+                    m.equation_latex if m.equation_latex is not None
+                    else _equation_latex_texts(m.equations)
+                )
+
+    return _render_visual_elements(
+        total_figures, total_tables, total_equations,
+        first_figure_captions, first_table_captions, first_equation_latex,
+    )
+
+
+def _truncate(s: str, limit: int) -> str:
+    """Clamp a display string to `limit` characters with an ellipsis."""
+    return s if len(s) <= limit else s[:limit] + "..."
+
+
+def _figure_caption_texts(figures: List[Dict]) -> List[str]:
+    """Pre-extract display-ready figure captions (validated and truncated)."""
+    texts = []
+    for fig in figures:
+        caption = fig.get('image_caption', [])
+        if isinstance(caption, list) and caption and isinstance(caption[0], str):
+            texts.append(_truncate(caption[0], 150))
+    return texts
+
+
+def _table_caption_texts(tables: List[Dict]) -> List[str]:
+    """Pre-extract display-ready table captions (validated and truncated)."""
+    texts = []
+    for tbl in tables:
+        caption = tbl.get('table_caption', [])
+        if isinstance(caption, list) and caption and isinstance(caption[0], str):
+            texts.append(_truncate(caption[0], 100))
+    return texts
+
+
+def _equation_latex_texts(equations: List[Dict]) -> List[str]:
+    """Pre-extract short LaTeX equation strings suitable for display."""
+    texts = []
+    for eq in equations:
+        latex = eq.get('text', '')
+        if latex and isinstance(latex, str) and len(latex) < 200:
+            texts.append(latex)
+    return texts
+
+
+def _render_visual_elements(
+    total_figures: int,
+    total_tables: int,
+    total_equations: int,
+    figure_captions: Optional[List[str]],
+    table_captions: Optional[List[str]],
+    equation_latex: Optional[List[str]],
+) -> str:
+    """Render the visual-elements section from pre-aggregated counts and
+    pre-extracted display strings - plain list slicing, no dict access."""
     if total_figures == 0 and total_tables == 0 and total_equations == 0:
         return ""
-    
-    lines.append("\n📊 Visual Elements Summary (from MinerU structured extraction):")
-    lines.append(f"  - Figures: {total_figures}")
-    lines.append(f"  - Tables: {total_tables}")
-    lines.append(f"  - Equations: {total_equations}")
-    
-    # Add figure captions if available
-    for m in modules:
-        if m.figures:
-            lines.append("\n🖼️  Key Figures:")
-            for idx, fig in enumerate(m.figures[:3], 1):  # Show first 3
-                caption = fig.get('image_caption', [])
-                if caption:
-                    caption_text = caption[0][:150] + "..." if len(caption[0]) > 150 else caption[0]
-                    lines.append(f"  Figure {idx}: {caption_text}")
-            break  # Only show from first module with figures
-    
+
+    buf = io.StringIO()
+    _app = _line_writer(buf)
+    _app("\n📊 Visual Elements Summary (from MinerU structured extraction):")
+    _app(f"  - Figures: {total_figures}")
+    _app(f"  - Tables: {total_tables}")
+    _app(f"  - Equations: {total_equations}")
+
+    # Display caps are tiny (3/2/3 items), so the loops are unrolled - no
+    # slice, enumerate, or loop setup per section
+
+    # Add figure captions if available (first module with figures only)
+    if figure_captions:
+        _app("\n🖼️  Key Figures:")
+        _app(f"  Figure 1: {figure_captions[0]}")
+        if len(figure_captions) >= 2:
+            _app(f"  Figure 2: {figure_captions[1]}")
+        if len(figure_captions) >= 3:
+            _app(f"  Figure 3: {figure_captions[2]}")
+
     # Add table info if available
-    for m in modules:
-        if m.tables:
-            lines.append("\n📋 Key Tables:")
-            for idx, tbl in enumerate(m.tables[:2], 1):  # Show first 2
-                caption = tbl.get('table_caption', [])
-                if caption:
-                    caption_text = caption[0][:100] + "..." if len(caption[0]) > 100 else caption[0]
-                    lines.append(f"  Table {idx}: {caption_text}")
-            break
-    
-    # Add LaTeX equations if available (Optimization 5)
-    for m in modules:
-        if m.equations:
-            lines.append("\n🔢 Key Equations (LaTeX):")
-            for idx, eq in enumerate(m.equations[:3], 1):  # Show first 3
-                latex = eq.get('text', '')
-                if latex and len(latex) < 200:  # Only show short equations
-                    lines.append(f"  Eq {idx}: {latex}")
-            break
-    
-    return "\n".join(lines)
+    if table_captions:
+        _app("\n📋 Key Tables:")
+        _app(f"  Table 1: {table_captions[0]}")
+        if len(table_captions) >= 2:
+            _app(f"  Table 2: {table_captions[1]}")
 
+    # Add LaTeX equations if available (Optimization 5)
+    if equation_latex:
+        _app("\n🔢 Key Equations (LaTeX):")
+        _app(f"  Eq 1: {equation_latex[0]}")
+        if len(equation_latex) >= 2:
+            _app(f"  Eq 2: {equation_latex[1]}")
+        if len(equation_latex) >= 3:
+            _app(f"  Eq 3: {equation_latex[2]}")
 
-def run_fusion_core(modules: List[Module], roles_map: Dict[str, List[str]]) -> Dict:
-    """
-    Phase 2: Deep reading + Nano Banana Pro visual translation.
-    
-    Returns analysis_result dict with:
-    - logic_summaries
-    - main_figure_ideas (two designs with full Nano Banana Pro params)
-    """
-    
-    # Build full markdown with role hints
-    role_hints_lines = ["Role hints from Phase 1:"]
-    for mid, roles in roles_map.items():
-        role_hints_lines.append(f"  {mid}: {', '.join(roles)}")
-    role_hints_text = "\n".join(role_hints_lines)
+    # Drop the final line terminator to match plain "\n".join output
+    return buf.getvalue()[:-1]
 
-    full_markdown_blocks = []
-    for m in modules:
-        header = f"# [{m.module_id}] {m.title}\n\n"
-        full_markdown_blocks.append(header + m.content)
-    full_markdown = "\n\n".join(full_markdown_blocks)
 
-    system_prompt = textwrap.dedent(
-        """
+# Dedented once at import time - the prompt is static and multi-KB
+_PHASE2_SYSTEM_PROMPT = textwrap.dedent(
+    """
         You are a dual expert: a senior academic researcher AND the chief scientific illustrator for "Nano Banana Pro".
         
         Your mission is to perform two parallel tasks with EXTREME ACCURACY:
@@ -811,50 +1110,145 @@ def run_fusion_core(modules: List[Module], roles_map: Dict[str, List[str]]) -> D
             ]
           }
         }
-        """
-    ).strip()
+    """
+).strip()
+
+# Static preamble of the Phase-2 user prompt - only the role hints, visual
+# elements summary, and paper markdown vary per call
+_PHASE2_USER_PREAMBLE = (
+    "🎯 CRITICAL REQUIREMENTS FOR ACADEMIC PAPER MAIN FIGURES:\n\n"
+    "1. **FLOW-BASED VISUAL PRIORITY** (MOST IMPORTANT):\n"
+    "   - At least ONE design MUST use a FLOW/PIPELINE-based container:\n"
+    "     • pipeline_flow_diagram (PREFERRED for most papers)\n"
+    "     • sequential_storyboard (for step-by-step processes)\n"
+    "     • layered_stack_diagram (for hierarchical architectures)\n"
+    "   - Academic papers are best explained through WORKFLOW and LOGIC FLOW!\n\n"
+
+    "2. **DATA-DRIVEN PROMPT GENERATION** (USE EXTRACTED INFORMATION):\n"
+    "   - You have access to structured data: figure captions, table descriptions, LaTeX equations\n"
+    "   - MUST incorporate these CONCRETE DETAILS into your final_prompt:\n"
+    "     • If you see 'Figure 1: Architecture of X', describe X's specific components in final_prompt\n"
+    "     • If you see equations like Attention(Q,K,V), mention the actual formula in final_prompt\n"
+    "     • If you see 'Table 1: Performance on X datasets', include dataset names and metrics\n"
+    "   - DO NOT write generic prompts! Use the ACTUAL content from Visual Elements Summary!\n\n"
+
+    "3. **LEVERAGE REASONING-CAPABLE IMAGE MODEL**:\n"
+    "   - The image generation model has reasoning ability - use it!\n"
+    "   - Your final_prompt can be COMPLEX and DETAILED (300-500 words is fine)\n"
+    "   - Include specific architectural components, mathematical notations, data flow details\n"
+    "   - Be precise with technical terms from the paper (model names, layer types, algorithm steps)\n\n"
+
+    "4. **TWO DIFFERENT DESIGNS (BOTH BRIGHT STYLES)**:\n"
+    "   - First design: Flow-based container (pipeline/sequential/layered) + BRIGHT style (academic_bright/infographic_colorful/data_journalism)\n"
+    "   - Second design: Different container OR different perspective + DIFFERENT BRIGHT style\n"
+    "   - DEFAULT: Use bright styles (academic_bright, infographic_colorful, data_journalism, medical_illustration)\n"
+    "   - AVOID dark styles (engineering_tech, modern_dashboard) unless paper topic specifically requires them\n\n"
+)
+
+
+def assemble_phase2_user_prompt(modules: List[Module], roles_map: Dict[str, List[str]]) -> str:
+    """Build the full Phase-2 user prompt with a single pass over modules.
+
+    Fuses the visual-elements aggregation with the full-markdown assembly so
+    the module list (and its figure/table/equation attributes) is walked once
+    instead of twice.
+    """
+    md_buf = io.StringIO()
+    md_write = md_buf.write
+    _hdr = "# [{}] {}\n\n".format  # bound once; avoids per-iteration f-string setup
 
-    # Build visual elements summary from structured JSON
-    visual_elements_summary = build_visual_elements_summary(modules)
-    
-    user_prompt = (
-        "🎯 CRITICAL REQUIREMENTS FOR ACADEMIC PAPER MAIN FIGURES:\n\n"
-        "1. **FLOW-BASED VISUAL PRIORITY** (MOST IMPORTANT):\n"
-        "   - At least ONE design MUST use a FLOW/PIPELINE-based container:\n"
-        "     • pipeline_flow_diagram (PREFERRED for most papers)\n"
-        "     • sequential_storyboard (for step-by-step processes)\n"
-        "     • layered_stack_diagram (for hierarchical architectures)\n"
-        "   - Academic papers are best explained through WORKFLOW and LOGIC FLOW!\n\n"
-        
-        "2. **DATA-DRIVEN PROMPT GENERATION** (USE EXTRACTED INFORMATION):\n"
-        "   - You have access to structured data: figure captions, table descriptions, LaTeX equations\n"
-        "   - MUST incorporate these CONCRETE DETAILS into your final_prompt:\n"
-        "     • If you see 'Figure 1: Architecture of X', describe X's specific components in final_prompt\n"
-        "     • If you see equations like Attention(Q,K,V), mention the actual formula in final_prompt\n"
-        "     • If you see 'Table 1: Performance on X datasets', include dataset names and metrics\n"
-        "   - DO NOT write generic prompts! Use the ACTUAL content from Visual Elements Summary!\n\n"
-        
-        "3. **LEVERAGE REASONING-CAPABLE IMAGE MODEL**:\n"
-        "   - The image generation model has reasoning ability - use it!\n"
-        "   - Your final_prompt can be COMPLEX and DETAILED (300-500 words is fine)\n"
-        "   - Include specific architectural components, mathematical notations, data flow details\n"
-        "   - Be precise with technical terms from the paper (model names, layer types, algorithm steps)\n\n"
-        
-        "4. **TWO DIFFERENT DESIGNS (BOTH BRIGHT STYLES)**:\n"
-        "   - First design: Flow-based container (pipeline/sequential/layered) + BRIGHT style (academic_bright/infographic_colorful/data_journalism)\n"
-        "   - Second design: Different container OR different perspective + DIFFERENT BRIGHT style\n"
-        "   - DEFAULT: Use bright styles (academic_bright, infographic_colorful, data_journalism, medical_illustration)\n"
-        "   - AVOID dark styles (engineering_tech, modern_dashboard) unless paper topic specifically requires them\n\n"
-        
-        + role_hints_text + "\n"
-        + visual_elements_summary + "\n\n"
-        + "=" * 80 + "\n"
-        + "Full paper markdown:\n\n"
-        + full_markdown
-    )
+    total_figures = 0
+    total_tables = 0
+    total_equations = 0
+    first_figure_captions: Optional[List[str]] = None
+    first_table_captions: Optional[List[str]] = None
+    first_equation_latex: Optional[List[str]] = None
+
+    for i, m in enumerate(modules):
+        if m.figures:
+            total_figures += len(m.figures)
+            if first_figure_captions is None:
+                first_figure_captions = (
+                    m.figure_captions if m.figure_captions is not None
+                    else _figure_caption_texts(m.figures)
+                )
+        if m.tables:
+            total_tables += len(m.tables)
+            if first_table_captions is None:
+                first_table_captions = (
+                    m.table_captions if m.table_captions is not None
+                    else _table_caption_texts(m.tables)
+                )
+        if m.equations:
+            total_equations += len(m.equations)
+            if first_equation_latex is None:
+                first_equation_latex = (
+                    m.equation_latex if m.equation_latex is not None
+                    else _equation_latex_texts(m.equations)
+                )
+
+        if i:
+            md_write("\n\n")
+        md_write(_hdr(m.module_id, m.title))
+        md_write(m.content)
+
+    buf = io.StringIO()
+    write = buf.write
+    write(_PHASE2_USER_PREAMBLE)
+
+    write("Role hints from Phase 1:")
+    for mid, roles in roles_map.items():
+        write(f"\n  {mid}: {', '.join(roles)}")
+    write("\n")
+    write(_render_visual_elements(
+        total_figures, total_tables, total_equations,
+        first_figure_captions, first_table_captions, first_equation_latex,
+    ))
+    write("\n\n")
+    write("=" * 80)
+    write("\nFull paper markdown:\n\n")
+    write(md_buf.getvalue())
+
+    return buf.getvalue()
+
+
+def run_fusion_core(
+    modules: List[Module],
+    roles_map: Dict[str, List[str]],
+    cache_dir: Optional[Path] = None,
+) -> Dict:
+    """
+    Phase 2: Deep reading + Nano Banana Pro visual translation.
+
+    When `cache_dir` is given, results are memoized on disk keyed by a hash of
+    the full prompt (module content + role hints + system prompt), so repeated
+    runs over the same PDF skip the expensive LLM call. Delete the cache
+    directory to invalidate.
+
+    Returns analysis_result dict with:
+    - logic_summaries
+    - main_figure_ideas (two designs with full Nano Banana Pro params)
+    """
+    user_prompt = assemble_phase2_user_prompt(modules, roles_map)
+
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.blake2b(
+            user_prompt.encode("utf-8") + _PHASE2_SYSTEM_PROMPT.encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        cache_path = cache_dir / f"{key}.json"
+        if cache_path.exists():
+            try:
+                cached = _json_loads(cache_path.read_bytes())
+                print(f"[Phase 2] Cache hit: {cache_path}", file=sys.stderr)
+                return cached
+            except Exception:
+                # Corrupt cache entry - fall through to a fresh LLM call
+                pass
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": _PHASE2_SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt},
     ]
 
@@ -866,23 +1260,29 @@ def run_fusion_core(modules: List[Module], roles_map: Dict[str, List[str]]) -> D
 
     content = data["choices"][0]["message"]["content"].strip()
     
-    # Debug: 保存原始 LLM 输出
-    debug_path = Path("/tmp/phase2_llm_output.txt")
-    debug_path.write_text(content, encoding="utf-8")
-    print(f"[DEBUG] Phase 2 LLM output saved to: {debug_path}", file=sys.stderr)
+    # Debug: 保存原始 LLM 输出 (set PIPELINE_DEBUG=1 to enable)
+    _debug_dump_text(Path("/tmp/phase2_llm_output.txt"), content, "Phase 2")
 
     try:
-        result = json.loads(content)
-    except json.JSONDecodeError:
-        match = re.search(r"\{[\s\S]*\}", content)
-        if not match:
+        result = _json_loads(content)
+    except (json.JSONDecodeError, ValueError):
+        result = _parse_llm_json(content)
+        if result is None:
             return {"analysis_result": {"raw_response": content}}
+
+    analysis = result.get("analysis_result") or result
+
+    if cache_path is not None:
         try:
-            result = json.loads(match.group(0))
-        except Exception:
-            return {"analysis_result": {"raw_response": content}}
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            if orjson is not None:
+                cache_path.write_bytes(orjson.dumps(analysis))
+            else:
+                cache_path.write_text(json.dumps(analysis, ensure_ascii=False), encoding="utf-8")
+        except Exception as e:
+            print(f"[Warning] Failed to write Phase 2 cache: {e}", file=sys.stderr)
 
-    return result.get("analysis_result") or result
+    return analysis
 
 
 # ============================================================
@@ -893,15 +1293,18 @@ def render_report(analysis_result: Dict) -> str:
     """
     Phase 3: Render structured data into a beautiful Markdown report.
     """
-    parts = ["# Paper Analysis & Visual Plan", ""]
+    buf = io.StringIO()
+    _app = _line_writer(buf)
+    _app("# Paper Analysis & Visual Plan")
+    _app("")
 
     # Check if we got a fallback raw response
     if "raw_response" in analysis_result:
-        parts.append("## Raw LLM Response")
-        parts.append("```")
-        parts.append(analysis_result["raw_response"])
-        parts.append("```")
-        return "\n".join(parts)
+        _app("## Raw LLM Response")
+        _app("```")
+        _app(analysis_result["raw_response"])
+        _app("```")
+        return buf.getvalue()[:-1]
 
     logic_summaries = analysis_result.get("logic_summaries") or {}
     main_figure_ideas = analysis_result.get("main_figure_ideas") or []
@@ -919,19 +1322,21 @@ def render_report(analysis_result: Dict) -> str:
 
     for key, title in summaries_order:
         summary = logic_summaries.get(key)
-        if summary and str(summary).strip():
-            parts.append(f"## {title}")
-            parts.append(str(summary))
-            parts.append("")
+        # Summaries are strings per the LLM contract; the isinstance check
+        # skips the str() round-trip the old truthiness test paid
+        if isinstance(summary, str) and summary.strip():
+            _app(f"## {title}")
+            _app(summary)
+            _app("")
 
     # Render main figure brainstorming section
     if main_figure_ideas:
-        parts.append("---")
-        parts.append("")
-        parts.append("# 🎨 Main Figure Brainstorming")
-        parts.append("")
-        parts.append("*Powered by Nano Banana Pro Visual Protocol*")
-        parts.append("")
+        _app("---")
+        _app("")
+        _app("# 🎨 Main Figure Brainstorming")
+        _app("")
+        _app("*Powered by Nano Banana Pro Visual Protocol*")
+        _app("")
 
         for idx, idea in enumerate(main_figure_ideas, 1):
             if not isinstance(idea, dict):
@@ -942,44 +1347,45 @@ def render_report(analysis_result: Dict) -> str:
             rationale = idea.get("rationale", "N/A")
             visual_params = idea.get("visual_params") or {}
 
-            parts.append(f"## Design {idx}: {concept_title}")
-            parts.append("")
-            parts.append(f"**Target Audience**: {target_audience}")
-            parts.append("")
-            parts.append(f"**Rationale**: {rationale}")
-            parts.append("")
+            _app(f"## Design {idx}: {concept_title}")
+            _app("")
+            _app(f"**Target Audience**: {target_audience}")
+            _app("")
+            _app(f"**Rationale**: {rationale}")
+            _app("")
 
             container = visual_params.get("container", "N/A")
             style = visual_params.get("style", "N/A")
             deconstruction = visual_params.get("deconstruction") or {}
 
-            parts.append(f"**Visual Container**: `{container}`")
-            parts.append(f"**Art Style**: `{style}`")
-            parts.append("")
+            _app(f"**Visual Container**: `{container}`")
+            _app(f"**Art Style**: `{style}`")
+            _app("")
 
             core_object = deconstruction.get("core_object", "N/A")
             components = deconstruction.get("components") or []
             flow = deconstruction.get("flow", "N/A")
 
-            parts.append(f"**Core Object**: {core_object}")
-            parts.append(f"**Components**:")
+            _app(f"**Core Object**: {core_object}")
+            _app(f"**Components**:")
             if isinstance(components, list):
-                for comp in components:
-                    parts.append(f"  - {comp}")
+                # Hard cap keeps malformed LLM output from flooding the report
+                for comp in components[:16]:
+                    _app(f"  - {comp}")
             else:
-                parts.append(f"  - {components}")
-            parts.append(f"**Flow**: {flow}")
-            parts.append("")
+                _app(f"  - {components}")
+            _app(f"**Flow**: {flow}")
+            _app("")
 
             final_prompt = visual_params.get("final_prompt", "")
             if final_prompt:
-                parts.append("**🎨 Final Prompt (Ready for Image Generation):**")
-                parts.append("```")
-                parts.append(final_prompt)
-                parts.append("```")
-            parts.append("")
+                _app("**🎨 Final Prompt (Ready for Image Generation):**")
+                _app("```")
+                _app(final_prompt)
+                _app("```")
+            _app("")
 
-    return "\n".join(parts)
+    return buf.getvalue()[:-1]
 
 
 # ============================================================
@@ -1012,7 +1418,7 @@ def main(argv=None):
         print(f"[1/5] Found structured data: {content_list_path}", file=sys.stderr)
 
     print("[2/5] Parsing markdown into modules ...", file=sys.stderr)
-    md_text = md_path.read_text(encoding="utf-8", errors="ignore")
+    md_text = _read_md(md_path)
     modules = parse_markdown_modules(md_text)
     if not modules:
         raise RuntimeError("No modules parsed")
@@ -1026,7 +1432,7 @@ def main(argv=None):
     print(f"[3/5] Roles map: {len(roles_map)} modules classified", file=sys.stderr)
 
     print("[4/5] Phase 2: Running Fusion Core (Nano Banana Pro) ...", file=sys.stderr)
-    analysis_result = run_fusion_core(modules, roles_map)
+    analysis_result = run_fusion_core(modules, roles_map, cache_dir=workdir_base / ".phase2_cache")
     print(f"[4/5] Analysis complete", file=sys.stderr)
 
     print("[5/5] Phase 3: Rendering report ...", file=sys.stderr)
@@ -1038,7 +1444,8 @@ def main(argv=None):
         report_name = pdf_path.stem + "_visual_plan.md"
         report_path = workdir_base / report_name
 
-    report_path.write_text(report_md, encoding="utf-8")
+    # Single binary write: no text-mode buffering or newline translation
+    report_path.write_bytes(report_md.encode("utf-8"))
     print(f"✅ Done. Report saved to: {report_path}")
 
 